@@ -1,3 +1,4 @@
+import asyncio
 import subprocess
 import json
 import re
@@ -33,6 +34,43 @@ def call_ollama(prompt, context=None):
         return None
 
 
+async def call_ollama_async(prompt, context=None):
+    """Async variant of call_ollama; waits on the subprocess without blocking the event loop."""
+    combined_prompt = prompt if not context else f"Context:\n{context}\n\nUser:\n{prompt}"
+    
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ollama", "run", "gemma3:1b",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        return None
+    
+    try:
+        stdout, _ = await asyncio.wait_for(
+            process.communicate(combined_prompt.encode('utf-8')), timeout=30
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None
+    
+    if process.returncode != 0:
+        return None
+    return stdout.decode('utf-8', errors='replace').strip()
+
+
+def _parse_gemini_text(response_text):
+    """Parses the JSON reflection out of Gemini's response text."""
+    json_str = _extract_json(response_text)
+    if json_str:
+        return json.loads(json_str)
+    else:
+        return json.loads(response_text)
+
+
 def call_gemini(prompt):
     """Call Google Gemini API."""
     api_key = os.getenv("GEMINI_API_KEY")
@@ -44,13 +82,25 @@ def call_gemini(prompt):
     try:
         model = genai.GenerativeModel("models/gemini-2.5-flash")
         response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        json_str = _extract_json(response_text)
-        if json_str:
-            return json.loads(json_str)
-        else:
-            return json.loads(response_text)
+        return _parse_gemini_text(response.text.strip())
+    except json.JSONDecodeError as e:
+        return {"error": f"Failed to parse response: {e}"}
+    except Exception as e:
+        return {"error": f"Failed to get response from Gemini: {e}"}
+
+
+async def call_gemini_async(prompt):
+    """Async variant of call_gemini."""
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return {"error": "GEMINI_API_KEY environment variable not set."}
+
+    genai.configure(api_key=api_key)
+    
+    try:
+        model = genai.GenerativeModel("models/gemini-2.5-flash")
+        response = await model.generate_content_async(prompt)
+        return _parse_gemini_text(response.text.strip())
     except json.JSONDecodeError as e:
         return {"error": f"Failed to parse response: {e}"}
     except Exception as e:
@@ -142,6 +192,19 @@ Example for anxious entry:
     return prompt
 
 
+def _parse_ollama_response(response):
+    """Returns the reflection parsed from an Ollama response, or None if it isn't valid JSON."""
+    print("✓ Using local Ollama model\n")
+    try:
+        json_str = _extract_json(response)
+        if not json_str:
+            raise json.JSONDecodeError("No JSON found", response, 0)
+        return json.loads(json_str)
+    except json.JSONDecodeError:
+        print("⚠️ Ollama returned invalid JSON. Falling back to Gemini...")
+        return None
+
+
 def generate_reflection(user_input, emotion=None, sentiment=None, past_patterns=None):
     """
     Generates contextual reflection with smart follow-ups based on emotion.
@@ -160,15 +223,35 @@ def generate_reflection(user_input, emotion=None, sentiment=None, past_patterns=
     response = call_ollama(prompt)
     
     if response:
-        print("✓ Using local Ollama model\n")
-        try:
-            json_str = _extract_json(response)
-            if not json_str:
-                raise json.JSONDecodeError("No JSON found", response, 0)
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            print("⚠️ Ollama returned invalid JSON. Falling back to Gemini...")
+        reflection = _parse_ollama_response(response)
+        if reflection is not None:
+            return reflection
     
     # Fall back to Gemini
     print("✓ Using Google Gemini API\n")
     return call_gemini(prompt)
+
+
+async def generate_reflection_async(user_input, emotion=None, sentiment=None, past_patterns=None):
+    """
+    Async variant of generate_reflection for the ASGI app.
+    The event loop stays free while waiting on Ollama or Gemini;
+    emotion analysis, if needed, runs in a worker thread.
+    """
+    if emotion is None or sentiment is None:
+        from emotion_analysis import analyze_emotion
+        sentiment, emotion = await asyncio.to_thread(analyze_emotion, user_input)
+    
+    prompt = build_contextual_prompt(user_input, emotion, sentiment, past_patterns)
+    
+    print("\n🧠 Generating empathetic reflection...\n")
+    
+    response = await call_ollama_async(prompt)
+    
+    if response:
+        reflection = _parse_ollama_response(response)
+        if reflection is not None:
+            return reflection
+    
+    print("✓ Using Google Gemini API\n")
+    return await call_gemini_async(prompt)
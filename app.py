@@ -1,17 +1,27 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session
 from datetime import datetime, timedelta
 import os
 import json
-import pandas as pd
+import numpy as np
 from dotenv import load_dotenv
 
-from config import MODEL, COPING_STRATEGIES, CRISIS_RESOURCES, EMOJI_MAP
-from database import init_db, insert_entry, load_entries
+from config import (
+    MODEL, COPING_STRATEGIES, CRISIS_RESOURCES, EMOJI_MAP,
+    SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE
+)
+from database import (
+    init_db, insert_entry, load_entries, search_entries, iter_entries
+)
+from export import stream_ndjson, stream_csv
+from cache import cached_view
+from snapshot import load_snapshot
+from storage import start_background_compaction
 from ai_engine import generate_reflection
 from emotion_analysis import analyze_emotion, get_emotion_category, get_emotion_severity
 from utils import (
     crisis_detect, get_similar_entries, get_emotion_patterns, 
-    get_sentiment_trends, get_emotion_triggers, get_low_sentiment_context
+    get_sentiment_trends, get_emotion_triggers, get_low_sentiment_context,
+    encode_cursor, decode_cursor
 )
 
 load_dotenv()
@@ -21,11 +31,13 @@ app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-change-this')
 
 # Initialize database
 init_db()
+start_background_compaction()
 
 @app.route('/')
+@cached_view
 def index():
     """Main dashboard page"""
-    df = load_entries()
+    snap = load_snapshot()
     
     # Calculate dashboard metrics
     dashboard_data = {
@@ -36,17 +48,18 @@ def index():
         'last_entry': None
     }
     
-    if not df.empty:
-        df['timestamp'] = df['timestamp'].astype(str)
+    if not snap.empty:
+        patterns = get_emotion_patterns(snap)
+        latest, _ = search_entries(sort_by='newest', page_size=1)
         dashboard_data = {
-            'total_entries': len(df),
-            'avg_sentiment': round(df['sentiment'].mean(), 2),
-            'most_common_emotion': df['emotion'].mode()[0] if not df['emotion'].mode().empty else 'N/A',
-            'positive_count': len(df[df['sentiment'] > 0.3]),
-            'last_entry': df.iloc[0].to_dict() if len(df) > 0 else None
+            'total_entries': len(snap),
+            'avg_sentiment': round(patterns['sentiment_stats']['average'], 2),
+            'most_common_emotion': next(iter(patterns['emotion_frequency']), 'N/A'),
+            'positive_count': int((snap.sentiment > np.float32(0.3)).sum()),
+            'last_entry': latest[0] if latest else None
         }
     
-    emotions = sorted(df['emotion'].unique().tolist()) if not df.empty else []
+    emotions = sorted(snap.emotions)
     
     return render_template('index.html', 
                          dashboard=dashboard_data, 
@@ -58,48 +71,31 @@ def journal():
     """Journal entry page"""
     return render_template('journal.html', emoji_map=EMOJI_MAP)
 
-@app.route('/api/generate-reflection', methods=['POST'])
-def api_generate_reflection():
-    """API endpoint to generate AI reflection"""
-    data = request.json
-    entry_text = data.get('entry', '').strip()
-    
-    if not entry_text:
-        return jsonify({'error': 'Entry text is required'}), 400
-    
-    # Analyze emotion and sentiment
-    sentiment, emotion = analyze_emotion(entry_text)
-    crisis_level = crisis_detect(entry_text)
-    
-    # Handle crisis situation
-    if crisis_level:
-        entry_data = {
-            "timestamp": datetime.now().isoformat(),
-            "entry": entry_text,
-            "reflection": "Crisis support flagged",
-            "summary": "Safety resources provided",
-            "followups": [],
-            "tone": "alert",
-            "safety": crisis_level,
-            "sentiment": sentiment,
-            "emotion": emotion
-        }
-        insert_entry(entry_data)
-        
-        return jsonify({
-            'crisis': True,
-            'crisis_level': crisis_level,
-            'resources': CRISIS_RESOURCES,
-            'sentiment': sentiment,
-            'emotion': emotion
-        })
-    
-    # Generate reflection
-    result = generate_reflection(entry_text, emotion, sentiment)
-    
-    if "error" in result:
-        return jsonify({'error': result['error']}), 500
+def save_crisis_entry(entry_text, crisis_level, sentiment, emotion):
+    """Stores a crisis-flagged entry and returns the crisis response payload"""
+    entry_data = {
+        "timestamp": datetime.now().isoformat(),
+        "entry": entry_text,
+        "reflection": "Crisis support flagged",
+        "summary": "Safety resources provided",
+        "followups": [],
+        "tone": "alert",
+        "safety": crisis_level,
+        "sentiment": sentiment,
+        "emotion": emotion
+    }
+    insert_entry(entry_data)
     
+    return {
+        'crisis': True,
+        'crisis_level': crisis_level,
+        'resources': CRISIS_RESOURCES,
+        'sentiment': sentiment,
+        'emotion': emotion
+    }
+
+def save_reflection(entry_text, result, sentiment, emotion):
+    """Stores a generated reflection and returns the response payload, including similar entries"""
     # Save entry to database
     entry_data = {
         "timestamp": datetime.now().isoformat(),
@@ -129,7 +125,7 @@ def api_generate_reflection():
     # Get severity
     severity = get_emotion_severity(sentiment)
     
-    return jsonify({
+    return {
         'reflection': result.get('reflection'),
         'summary': result.get('summary'),
         'actionable_insight': result.get('actionable_insight'),
@@ -141,58 +137,88 @@ def api_generate_reflection():
         'severity': severity,
         'similar_entries': similar_list,
         'emoji': EMOJI_MAP.get(emotion.lower(), '')
-    })
+    }
+
+@app.route('/api/generate-reflection', methods=['POST'])
+def api_generate_reflection():
+    """API endpoint to generate AI reflection"""
+    data = request.json
+    entry_text = data.get('entry', '').strip()
+    
+    if not entry_text:
+        return jsonify({'error': 'Entry text is required'}), 400
+    
+    # Analyze emotion and sentiment
+    sentiment, emotion = analyze_emotion(entry_text)
+    crisis_level = crisis_detect(entry_text)
+    
+    # Handle crisis situation
+    if crisis_level:
+        return jsonify(save_crisis_entry(entry_text, crisis_level, sentiment, emotion))
+    
+    # Generate reflection
+    result = generate_reflection(entry_text, emotion, sentiment)
+    
+    if "error" in result:
+        return jsonify({'error': result['error']}), 500
+    
+    return jsonify(save_reflection(entry_text, result, sentiment, emotion))
 
 @app.route('/search')
 def search():
     """Search and filter page"""
-    df = load_entries()
-    emotions = sorted(df['emotion'].unique().tolist()) if not df.empty else []
+    emotions = sorted(load_snapshot().emotions)
     return render_template('search.html', emotions=emotions, emoji_map=EMOJI_MAP)
 
-@app.route('/api/search', methods=['POST'])
-def api_search():
-    """API endpoint for searching entries"""
-    data = request.json
+def search_payload(data):
+    """
+    Runs one page of a search request.
+    Raises ValueError if the request carries a malformed cursor or page_size.
+    """
     search_query = data.get('query', '').lower()
     emotion_filter = data.get('emotions', [])
     sentiment_range = data.get('sentiment_range', [-1.0, 1.0])
     sort_by = data.get('sort_by', 'newest')
-    
-    df = load_entries()
-    
-    if df.empty:
-        return jsonify({'entries': [], 'count': 0})
-    
-    # Apply filters
-    filtered = df.copy()
-    
-    if search_query:
-        filtered = filtered[filtered['entry'].str.lower().str.contains(search_query, na=False)]
-    
-    if emotion_filter:
-        filtered = filtered[filtered['emotion'].isin(emotion_filter)]
-    
-    filtered = filtered[
-        (filtered['sentiment'] >= sentiment_range[0]) & 
-        (filtered['sentiment'] <= sentiment_range[1])
-    ]
-    
-    # Sort
-    if sort_by == 'newest':
-        filtered = filtered.sort_values('timestamp', ascending=False)
-    elif sort_by == 'oldest':
-        filtered = filtered.sort_values('timestamp', ascending=True)
-    elif sort_by == 'positive':
-        filtered = filtered.sort_values('sentiment', ascending=False)
-    else:  # negative
-        filtered = filtered.sort_values('sentiment', ascending=True)
-    
-    entries = filtered.to_dict('records')
-    
-    return jsonify({
+    try:
+        page_size = int(data.get('page_size', SEARCH_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise ValueError('page_size must be an integer')
+    page_size = max(1, min(page_size, MAX_SEARCH_PAGE_SIZE))
+    cursor = decode_cursor(data.get('cursor'))
+    
+    entries, next_cursor, count = search_entries(
+        search_query, emotion_filter, sentiment_range,
+        sort_by=sort_by, cursor=cursor, page_size=page_size, with_count=True
+    )
+    
+    return {
         'entries': entries,
-        'count': len(entries)
+        'count': count,
+        'page_size': page_size,
+        'next_cursor': encode_cursor(next_cursor)
+    }
+
+@app.route('/api/search', methods=['POST'])
+def api_search():
+    """API endpoint for searching entries, one keyset-paginated page at a time"""
+    try:
+        return jsonify(search_payload(request.json))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/export/<fmt>')
+def api_export(fmt):
+    """Streams every journal entry as NDJSON or CSV"""
+    if fmt == 'ndjson':
+        body, mimetype = stream_ndjson(iter_entries()), 'application/x-ndjson'
+    elif fmt == 'csv':
+        body, mimetype = stream_csv(iter_entries()), 'text/csv'
+    else:
+        return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+    
+    # No Content-Length, so the body goes out with chunked transfer encoding
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=journal_entries.{fmt}'
     })
 
 @app.route('/analytics')
@@ -200,32 +226,37 @@ def analytics():
     """Analytics page"""
     return render_template('analytics.html')
 
-@app.route('/api/analytics')
-def api_analytics():
-    """API endpoint for analytics data"""
-    df = load_entries()
+def analytics_payload():
+    """Builds the analytics data served by /api/analytics"""
+    snap = load_snapshot()
     
-    if df.empty:
-        return jsonify({'empty': True})
-    
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    if snap.empty:
+        return {'empty': True}
     
     # Calculate metrics
-    total = len(df)
-    avg_sentiment = round(df['sentiment'].mean(), 2)
-    positive_pct = round((len(df[df['sentiment'] > 0.3]) / total * 100), 0)
-    days_span = (df['timestamp'].max() - df['timestamp'].min()).days
-    
-    # Sentiment over time data
-    sentiment_data = df[['timestamp', 'sentiment']].to_dict('records')
+    total = len(snap)
+    scored = snap.scored_sentiment()
+    avg_sentiment = round(float(scored.mean(dtype=np.float64)), 2) if len(scored) else 0.0
+    positive_pct = round(int((snap.sentiment > np.float32(0.3)).sum()) / total * 100, 0)
+    days_span = int((snap.timestamp.max() - snap.timestamp.min()) // 86400)
+    
+    # Sentiment over time data, newest first
+    newest_first = np.argsort(snap.timestamp, kind='stable')[::-1]
+    sentiment_data = [
+        {'timestamp': timestamp, 'sentiment': None if np.isnan(sentiment) else sentiment}
+        for timestamp, sentiment in zip(
+            snap.timestamps_iso(newest_first),
+            snap.sentiment[newest_first].astype(np.float64).round(6).tolist()
+        )
+    ]
     
     # Emotion distribution
-    emotion_counts = df['emotion'].value_counts().to_dict()
+    emotion_counts = get_emotion_patterns(snap)['emotion_frequency']
     
     # Recent entries
-    recent = df.head(10).to_dict('records')
+    recent, _ = search_entries(sort_by='newest', page_size=10)
     
-    return jsonify({
+    return {
         'empty': False,
         'metrics': {
             'total': total,
@@ -236,31 +267,42 @@ def api_analytics():
         'sentiment_data': sentiment_data,
         'emotion_counts': emotion_counts,
         'recent_entries': recent
-    })
+    }
+
+@app.route('/api/analytics')
+@cached_view
+def api_analytics():
+    """API endpoint for analytics data"""
+    return jsonify(analytics_payload())
 
 @app.route('/insights')
 def insights():
     """Insights page"""
     return render_template('insights.html', emoji_map=EMOJI_MAP)
 
-@app.route('/api/insights')
-def api_insights():
-    """API endpoint for insights data"""
-    df = load_entries()
+def insights_payload():
+    """Builds the insights data served by /api/insights"""
+    snap = load_snapshot()
     
-    if df.empty:
-        return jsonify({'empty': True})
+    if snap.empty:
+        return {'empty': True}
     
-    patterns = get_emotion_patterns(df)
-    transitions = get_emotion_triggers(df)
-    low_context = get_low_sentiment_context(df)
+    patterns = get_emotion_patterns(snap)
+    transitions = get_emotion_triggers(snap)
+    low_context = get_low_sentiment_context(snap)
     
-    return jsonify({
+    return {
         'empty': False,
         'patterns': patterns,
         'transitions': transitions,
         'low_context': low_context
-    })
+    }
+
+@app.route('/api/insights')
+@cached_view
+def api_insights():
+    """API endpoint for insights data"""
+    return jsonify(insights_payload())
 
 @app.route('/about')
 def about():
@@ -0,0 +1,136 @@
+"""
+ASGI entry point.
+
+Reflection and read APIs are async: waiting on Ollama or Gemini holds no
+worker, and CPU-bound model, pandas and SQLite work runs in a thread pool.
+All other routes are served by the Flask app mounted underneath.
+
+    gunicorn asgi:app -k uvicorn_worker.UvicornWorker -w 2
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from app import (
+    app as flask_app, analytics_payload, insights_payload, search_payload,
+    save_crisis_entry, save_reflection
+)
+from ai_engine import generate_reflection_async
+from cache import cache_key, lookup, store
+from config import ASGI_CPU_WORKERS
+from emotion_analysis import analyze_emotion
+from utils import crisis_detect
+
+cpu_executor = ThreadPoolExecutor(max_workers=ASGI_CPU_WORKERS, thread_name_prefix="reflect-cpu")
+
+
+async def run_cpu(fn, *args):
+    """Runs blocking or CPU-bound work off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, partial(fn, *args))
+
+
+def json_body(payload):
+    """
+    Encodes payload through Flask's JSON provider, as jsonify does, so the
+    bytes (compact separators, sorted keys) and ETags match across modes.
+    """
+    with flask_app.app_context():
+        return flask_app.json.response(payload).get_data()
+
+
+def json_response(payload, status_code=200):
+    return Response(json_body(payload), status_code=status_code, media_type="application/json")
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or f'"{etag}"' in tags or f'W/"{etag}"' in tags
+
+
+async def cached_json(request, endpoint, build):
+    """
+    Serves build()'s payload through the versioned response cache shared
+    with the Flask views, answering If-None-Match with 304 Not Modified.
+    """
+    def render():
+        key = cache_key(endpoint, request.query_params.multi_items())
+        cached = lookup(key)
+        if cached is None:
+            cached = store(key, json_body(build()), "application/json")
+        return cached
+
+    body, mimetype, etag = await run_cpu(render)
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=mimetype, headers=headers)
+
+
+async def api_generate_reflection(request):
+    """API endpoint to generate AI reflection"""
+    try:
+        data = await request.json()
+    except ValueError:
+        # Malformed JSON is a client error, as with Flask's request.json
+        return json_response({'error': 'Request body must be valid JSON'}, 400)
+    entry_text = data.get('entry', '').strip()
+
+    if not entry_text:
+        return json_response({'error': 'Entry text is required'}, 400)
+
+    # Analyze emotion and sentiment
+    sentiment, emotion = await run_cpu(analyze_emotion, entry_text)
+    crisis_level = crisis_detect(entry_text)
+
+    # Handle crisis situation
+    if crisis_level:
+        return json_response(
+            await run_cpu(save_crisis_entry, entry_text, crisis_level, sentiment, emotion)
+        )
+
+    # Generate reflection; the LLM wait only parks this coroutine
+    result = await generate_reflection_async(entry_text, emotion, sentiment)
+
+    if "error" in result:
+        return json_response({'error': result['error']}, 500)
+
+    return json_response(await run_cpu(save_reflection, entry_text, result, sentiment, emotion))
+
+
+async def api_search(request):
+    """API endpoint for searching entries, one keyset-paginated page at a time"""
+    try:
+        data = await request.json()
+    except ValueError:
+        return json_response({'error': 'Request body must be valid JSON'}, 400)
+    try:
+        return json_response(await run_cpu(search_payload, data))
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+
+
+async def api_analytics(request):
+    """API endpoint for analytics data"""
+    return await cached_json(request, 'api_analytics', analytics_payload)
+
+
+async def api_insights(request):
+    """API endpoint for insights data"""
+    return await cached_json(request, 'api_insights', insights_payload)
+
+
+app = Starlette(routes=[
+    Route('/api/generate-reflection', api_generate_reflection, methods=['POST']),
+    Route('/api/search', api_search, methods=['POST']),
+    Route('/api/analytics', api_analytics),
+    Route('/api/insights', api_insights),
+    # Pages, exports and everything else stay on the sync Flask app
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
@@ -0,0 +1,84 @@
+"""
+Regression check and throughput benchmark for sentiment_engine.
+
+Compares polarity against TextBlob on a corpus of journal-style entries,
+then reports texts/sec for TextBlob, single-text and batched scoring.
+
+Usage: python benchmarks/sentiment_benchmark.py [repeat]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from textblob import TextBlob
+
+from sentiment_engine import POLARITY_TOLERANCE, load_lexicon, score_sentiment, score_sentiments
+
+REGRESSION_CORPUS = [
+    "Today was a really good day. I finally finished the project!",
+    "I am not happy with how the meeting went.",
+    "I feel hopeless and worthless, nothing I do matters.",
+    "Work was stressful but I managed. Proud of myself!",
+    "I'm so anxious about the exam tomorrow, I can't sleep.",
+    "Had coffee with an old friend :) it was lovely.",
+    "Not a great week, honestly. Everything feels heavy.",
+    "The weather was terrible and the bus was late again...",
+    "I never thought I'd feel this calm. Grateful for small things.",
+    "Really not good. I snapped at my sister and I feel ashamed.",
+    "Extremely tired, very lonely, but hopeful about next month.",
+    "My dog made me laugh so hard today <3",
+    "I don't know what I want anymore.",
+    "It was an ordinary day, nothing special happened.",
+    "Such a wonderful (!) meeting with my manager.",
+    "I feel overwhelmed by all the deadlines :(",
+    "Dinner with family was peaceful and warm.",
+    "Frustrated that I keep making the same mistakes.",
+    "Mr. Lee said the results were fine, which was a relief.",
+    "Absolutely amazing concert, best night of the year!!",
+    # Intensifiers next to contractions
+    "I really can't be happy about this.",
+    "Very don't nice of them to cancel.",
+    "I'm really not sure I'd be okay on my own.",
+    "It's extremely good that we're finally here.",
+    "I really didn't enjoy it, it's very sad.",
+    "So excited, can't wait for the weekend!",
+    "",
+]
+
+
+def check_regression():
+    worst = 0.0
+    for text in REGRESSION_CORPUS:
+        expected = TextBlob(text).sentiment.polarity
+        got = score_sentiment(text)
+        worst = max(worst, abs(expected - got))
+    print(f"max |polarity - TextBlob| = {worst:.4f} (tolerance {POLARITY_TOLERANCE})")
+    return worst <= POLARITY_TOLERANCE
+
+
+def throughput(label, fn, texts):
+    start = time.perf_counter()
+    fn(texts)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(texts) / elapsed:>12,.0f} texts/sec")
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    texts = REGRESSION_CORPUS * repeat
+
+    # Exclude one-off lexicon loading from the timings
+    load_lexicon()
+    TextBlob("warm up").sentiment
+
+    ok = check_regression()
+    throughput("TextBlob (per call)", lambda ts: [TextBlob(t).sentiment.polarity for t in ts], texts)
+    throughput("score_sentiment (per call)", lambda ts: [score_sentiment(t) for t in ts], texts)
+    throughput("score_sentiments (batched)", score_sentiments, texts)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from config import RESPONSE_CACHE_SIZE
+from database import get_data_version
+
+# (endpoint, params, data_version) -> (body, mimetype, etag), in LRU order
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def cache_key(endpoint, params):
+    """
+    Builds a cache key for an endpoint and its request params.
+    The current data version is part of the key, so any new entry
+    invalidates every cached response at once.
+    """
+    return (endpoint, tuple(sorted(params)), get_data_version())
+
+
+def make_etag(body):
+    """Strong ETag derived from the exact response bytes."""
+    return hashlib.sha256(body).hexdigest()
+
+
+def lookup(key):
+    """Returns the cached (body, mimetype, etag) for key, or None."""
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+        return cached
+
+
+def store(key, body, mimetype):
+    """Caches a response body and returns its (body, mimetype, etag)."""
+    cached = (body, mimetype, make_etag(body))
+    with _lock:
+        _cache[key] = cached
+        _cache.move_to_end(key)
+        while len(_cache) > RESPONSE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return cached
+
+
+def cached_view(view):
+    """
+    Caches a GET view's response per (endpoint, query params, data version)
+    and answers If-None-Match with 304 Not Modified.
+    Only successful (200) responses are cached.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = cache_key(request.endpoint, request.args.items(multi=True))
+        cached = lookup(key)
+
+        if cached is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            cached = store(key, response.get_data(), response.mimetype)
+
+        body, mimetype, etag = cached
+        response = current_app.response_class(body, mimetype=mimetype)
+        response.set_etag(etag)
+        # Let browsers keep the body but revalidate on every view
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    return wrapper
@@ -0,0 +1,46 @@
+import json
+import zlib
+from functools import lru_cache
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Text columns packed into one compressed blob per cold-storage row
+COLD_TEXT_FIELDS = ("entry", "reflection", "summary", "followups")
+
+DEFAULT_CODEC = "zstd" if zstandard is not None else "zlib"
+
+
+def pack_fields(fields, codec=DEFAULT_CODEC):
+    """Compresses a dict of text fields into a single blob."""
+    data = json.dumps(fields, ensure_ascii=False).encode("utf-8")
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, 9)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+@lru_cache(maxsize=256)
+def unpack_fields(codec, payload):
+    """Decompresses a blob made by pack_fields back into its dict of fields."""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed entries")
+        data = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec == "zlib":
+        data = zlib.decompress(payload)
+    else:
+        raise ValueError(f"Unknown codec: {codec}")
+    return json.loads(data)
+
+
+def unpack_field(codec, payload, name):
+    """
+    Returns one field from a packed blob.
+    Registered as an SQL function so the all_journals view can read cold rows.
+    Consecutive calls for the same row hit the unpack_fields cache.
+    """
+    return unpack_fields(codec, payload).get(name)
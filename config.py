@@ -1,6 +1,24 @@
 MODEL = "models/gemini-2.5-flash"
 DB_FILE = "journal_entries.db"
 
+# Memory-mapped columnar snapshot shared by all workers (see snapshot.py)
+SNAPSHOT_DIR = "journal_snapshot"
+
+# Tiered storage (see storage.py)
+COLD_STORAGE_AGE_DAYS = 90
+COMPACTION_INTERVAL_HOURS = 6
+VACUUM_INTERVAL_HOURS = 24 * 7
+
+# Max number of rendered responses kept per worker by the response cache
+RESPONSE_CACHE_SIZE = 128
+
+# Threads for model, pandas and SQLite work when serving via asgi.py
+ASGI_CPU_WORKERS = 4
+
+# Search pagination
+SEARCH_PAGE_SIZE = 50
+MAX_SEARCH_PAGE_SIZE = 200
+
 # Enhanced crisis detection keywords
 CRISIS_WORDS = [
     # Suicidal ideation
@@ -1,6 +1,35 @@
+import heapq
+import secrets
 import sqlite3
 import pandas as pd
 from config import DB_FILE
+from compression import unpack_field, unpack_fields
+
+ENTRY_COLUMNS = [
+    "id", "timestamp", "entry", "reflection", "summary",
+    "followups", "tone", "safety", "sentiment", "emotion"
+]
+# journals_cold keeps the plain columns and packs the text into payload
+COLD_COLUMNS = ["id", "timestamp", "tone", "safety", "sentiment", "emotion", "codec", "payload"]
+
+# sort_by -> (column, direction) for search_entries
+SORT_ORDERS = {
+    "newest": ("timestamp", "DESC"),
+    "oldest": ("timestamp", "ASC"),
+    "positive": ("sentiment", "DESC"),
+    "negative": ("sentiment", "ASC"),
+}
+
+def connect():
+    """
+    Opens a connection with the SQL functions used by the all_journals view
+    and by search, so reads see hot and cold entries alike.
+    """
+    conn = sqlite3.connect(DB_FILE)
+    conn.create_function("unpack_field", 3, unpack_field, deterministic=True)
+    # SQLite's LOWER() only folds ASCII; match pandas' str.lower() instead
+    conn.create_function("py_lower", 1, _lower, deterministic=True)
+    return conn
 
 def init_db():
     conn = sqlite3.connect(DB_FILE)
@@ -19,6 +48,53 @@ def init_db():
         emotion TEXT
     )
     """)
+    # Monotonic counter bumped on every write; used to key response caches
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER
+    )
+    """)
+    c.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+    # Random identity of this database file, so derived copies (snapshot.py)
+    # can tell a recreated database from the one they were built from
+    c.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('db_id', ?)", (secrets.randbits(62),))
+    # Keyset pagination walks these in sort order instead of sorting the whole
+    # table, as long as no other indexed filter (e.g. a sentiment range) wins
+    c.execute("CREATE INDEX IF NOT EXISTS idx_journals_timestamp ON journals (timestamp, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_journals_sentiment ON journals (sentiment, id)")
+    # Cold tier for old entries (see storage.py): text columns are packed into one
+    # compressed payload, numeric/emotion columns stay plain for analytics
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS journals_cold (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT,
+        tone TEXT,
+        safety TEXT,
+        sentiment REAL,
+        emotion TEXT,
+        codec TEXT,
+        payload BLOB
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_journals_cold_timestamp ON journals_cold (timestamp, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_journals_cold_sentiment ON journals_cold (sentiment, id)")
+    # load_entries reads through this view, which decompresses cold rows on the fly;
+    # search_entries and iter_entries read each tier on its own index instead
+    c.execute("""
+    CREATE VIEW IF NOT EXISTS all_journals AS
+        SELECT id, timestamp, entry, reflection, summary, followups,
+               tone, safety, sentiment, emotion
+        FROM journals
+        UNION ALL
+        SELECT id, timestamp,
+               unpack_field(codec, payload, 'entry'),
+               unpack_field(codec, payload, 'reflection'),
+               unpack_field(codec, payload, 'summary'),
+               unpack_field(codec, payload, 'followups'),
+               tone, safety, sentiment, emotion
+        FROM journals_cold
+    """)
     conn.commit()
     conn.close()
 
@@ -33,11 +109,222 @@ def insert_entry(data):
         str(data["followups"]), data["tone"], data["safety"],
         data["sentiment"], data["emotion"]
     ))
+    c.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
     conn.commit()
     conn.close()
 
 def load_entries():
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("SELECT * FROM journals ORDER BY timestamp DESC", conn)
+    conn = connect()
+    df = pd.read_sql_query("SELECT * FROM all_journals ORDER BY timestamp DESC", conn)
     conn.close()
     return df
+
+def get_data_version():
+    """Returns the current data version, bumped by every insert_entry call."""
+    conn = sqlite3.connect(DB_FILE)
+    row = conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+def get_db_state(conn=None):
+    """
+    Returns (db_id, data_version). Pass conn to read them inside a
+    transaction that is already open on it.
+    """
+    own = conn is None
+    if own:
+        conn = sqlite3.connect(DB_FILE)
+    try:
+        return tuple(conn.execute("""
+            SELECT (SELECT value FROM meta WHERE key = 'db_id'),
+                   (SELECT value FROM meta WHERE key = 'data_version')
+        """).fetchone())
+    finally:
+        if own:
+            conn.close()
+
+
+def _lower(text):
+    return text.lower() if text is not None else None
+
+
+def _search_filters(emotions, sentiment_range):
+    """Builds the WHERE clauses and params on plain columns shared by both tiers."""
+    clauses = ["1"]
+    params = []
+    # Sentiment always lies in [-1, 1]; filtering on the full range would
+    # only steer SQLite onto the sentiment index and force a sort by timestamp
+    low, high = sentiment_range
+    if low > -1.0 or high < 1.0:
+        clauses.append("sentiment BETWEEN ? AND ?")
+        params.extend([low, high])
+    if emotions:
+        clauses.append(f"emotion IN ({', '.join('?' * len(emotions))})")
+        params.extend(emotions)
+    return clauses, params
+
+
+def _sort_key(column):
+    # NULLs sort first ascending and last descending, as in SQLite
+    return lambda row: (row[column] is not None, row[column], row["id"])
+
+
+def _after_cursor(row, column, cursor, descending):
+    """Python twin of the keyset clause; NULL sort values never match, as in SQL."""
+    value = row[column]
+    if value is None:
+        return False
+    if descending:
+        return (value, row["id"]) < tuple(cursor)
+    return (value, row["id"]) > tuple(cursor)
+
+
+def _page_rows(conn, table, columns, clauses, params, column, direction, cursor, limit):
+    """
+    Returns the first `limit` rows of one tier in sort order after cursor.
+    Only plain columns are filtered and sorted, so the tier's index serves the order.
+    """
+    clauses, params = list(clauses), list(params)
+    if cursor is not None:
+        op = "<" if direction == "DESC" else ">"
+        value, last_id = cursor
+        clauses.append(f"({column} {op} ? OR ({column} = ? AND id {op} ?))")
+        params.extend([value, value, last_id])
+    rows = conn.execute(f"""
+        SELECT {', '.join(columns)} FROM {table}
+        WHERE {' AND '.join(clauses)}
+        ORDER BY {column} {direction}, id {direction}
+        LIMIT ?
+    """, params + [limit]).fetchall()
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _scan_cold(conn, query, clauses, params, column, descending, cursor, limit, with_count):
+    """
+    Text search over the cold tier, whose entries are only readable compressed.
+    Each candidate is decompressed at most once; the count and the page come
+    from the same pass. Returns (first `limit` matches after cursor, match count).
+    """
+    total = 0
+
+    def matches():
+        nonlocal total
+        rows = conn.execute(
+            f"SELECT {', '.join(COLD_COLUMNS)} FROM journals_cold WHERE {' AND '.join(clauses)}",
+            params
+        )
+        for row in rows:
+            row = dict(zip(COLD_COLUMNS, row))
+            after = cursor is None or _after_cursor(row, column, cursor, descending)
+            if not (after or with_count):
+                continue
+            fields = unpack_fields(row.pop("codec"), row.pop("payload"))
+            if query not in (fields.get("entry") or "").lower():
+                continue
+            total += 1
+            if after:
+                row.update(fields)
+                yield row
+
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    page = pick(limit, matches(), key=_sort_key(column))
+    return page, total
+
+
+def _count(conn, table, clauses, params):
+    return conn.execute(
+        f"SELECT COUNT(*) FROM {table} WHERE {' AND '.join(clauses)}", params
+    ).fetchone()[0]
+
+
+def search_entries(query="", emotions=(), sentiment_range=(-1.0, 1.0),
+                   sort_by="newest", cursor=None, page_size=50, with_count=False):
+    """
+    Returns one page of matching entries as dicts plus the cursor for the next page.
+    Uses keyset pagination: cursor is the (sort value, id) of the last row
+    of the previous page, or None for the first page.
+    next_cursor is None when there are no more results.
+    With with_count, also returns the total number of matches as a third value.
+
+    Each tier is paged on its own plain columns and the two pages are merged,
+    so only the cold entries that end up on the page are decompressed
+    (all cold candidates once, for a text query).
+    """
+    column, direction = SORT_ORDERS.get(sort_by, SORT_ORDERS["negative"])
+    descending = direction == "DESC"
+    page_size = max(1, page_size)
+    query = query.lower()
+    clauses, params = _search_filters(emotions, sentiment_range)
+
+    conn = connect()
+    try:
+        hot_clauses, hot_params = list(clauses), list(params)
+        if query:
+            hot_clauses.append("instr(py_lower(entry), ?) > 0")
+            hot_params.append(query)
+        rows = _page_rows(conn, "journals", ENTRY_COLUMNS, hot_clauses, hot_params,
+                          column, direction, cursor, page_size + 1)
+        count = _count(conn, "journals", hot_clauses, hot_params) if with_count else 0
+
+        if query:
+            cold_rows, cold_count = _scan_cold(conn, query, clauses, params, column,
+                                               descending, cursor, page_size + 1, with_count)
+        else:
+            cold_rows = _page_rows(conn, "journals_cold", COLD_COLUMNS, clauses, params,
+                                   column, direction, cursor, page_size + 1)
+            cold_count = _count(conn, "journals_cold", clauses, params) if with_count else 0
+    finally:
+        conn.close()
+
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    rows = pick(page_size + 1, rows + cold_rows, key=_sort_key(column))
+
+    entries = []
+    for row in rows[:page_size]:
+        if "payload" in row:
+            row.update(unpack_fields(row.pop("codec"), row.pop("payload")))
+        entries.append({name: row.get(name) for name in ENTRY_COLUMNS})
+    next_cursor = None
+    if len(rows) > page_size:
+        last = entries[-1]
+        next_cursor = (last[column], last["id"])
+    if with_count:
+        return entries, next_cursor, count + cold_count
+    return entries, next_cursor
+
+
+def iter_entries(chunk_size=500, after_id=0, conn=None):
+    """
+    Yields every entry with id > after_id as a dict in insertion order,
+    fetching chunk_size rows at a time so memory stays flat regardless
+    of table size. Pass conn to read inside a transaction already open on it.
+
+    Each tier is read in primary-key order and the two are merged, so the
+    first row streams out without sorting the table; cold rows are
+    decompressed one at a time as they are yielded.
+    """
+    own = conn is None
+    if own:
+        conn = connect()
+    try:
+        hot = _iter_table(conn, "journals", ENTRY_COLUMNS, after_id, chunk_size)
+        cold = _iter_table(conn, "journals_cold", COLD_COLUMNS, after_id, chunk_size)
+        for row in heapq.merge(hot, cold, key=lambda row: row["id"]):
+            if "payload" in row:
+                row.update(unpack_fields(row.pop("codec"), row.pop("payload")))
+            yield {name: row.get(name) for name in ENTRY_COLUMNS}
+    finally:
+        if own:
+            conn.close()
+
+
+def _iter_table(conn, table, columns, after_id, chunk_size):
+    cursor = conn.execute(
+        f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id", (after_id,)
+    )
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for row in rows:
+            yield dict(zip(columns, row))
@@ -1,6 +1,7 @@
-from textblob import TextBlob
 from transformers import pipeline
 
+from sentiment_engine import score_sentiment
+
 # Use a pipeline for zero-shot classification
 emotion_classifier = pipeline(
     "zero-shot-classification",
@@ -20,7 +21,7 @@ def analyze_emotion(text):
     more relevant to emotional well-being tracking.
     """
     # Get sentiment polarity (-1 to 1)
-    sentiment = TextBlob(text).sentiment.polarity
+    sentiment = score_sentiment(text)
     
     # Get more specific emotion using zero-shot classification
     result = emotion_classifier(text, EMOTION_LABELS, multi_label=False)
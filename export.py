@@ -0,0 +1,26 @@
+import csv
+import io
+import json
+
+from database import ENTRY_COLUMNS
+
+
+def stream_ndjson(entries):
+    """Yields one JSON document per line for each entry."""
+    for entry in entries:
+        yield json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+def stream_csv(entries, columns=ENTRY_COLUMNS):
+    """Yields a CSV header row followed by one row per entry."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for entry in entries:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(entry)
+        yield buffer.getvalue()
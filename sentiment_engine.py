@@ -0,0 +1,207 @@
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from functools import lru_cache
+
+import numpy as np
+
+# Max absolute polarity difference from TextBlob's PatternAnalyzer allowed on
+# the regression corpus in benchmarks/sentiment_benchmark.py
+POLARITY_TOLERANCE = 0.05
+
+NEGATIONS = frozenset(("no", "not", "n't", "never"))
+
+# Kept as a string on purpose: pattern tests emoticon candidates with a
+# substring check against it, and we mirror that behaviour
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+_SPLIT_PUNCTUATION = tuple(PUNCTUATION.replace(".", ""))
+
+EMOTICONS = {
+    +1.00: ("<3", "♥", ">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "XD", "xD", "8-D"),
+    +0.75: (">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)"),
+    +0.50: (">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)"),
+    +0.25: (">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)"),
+    +0.05: (">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°"),
+    -0.25: (">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>"),
+    -0.75: (">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/"),
+    -1.00: (":'(", ":'''(", ";'("),
+}
+EMOTICON_POLARITY = {e.lower(): p for p, faces in EMOTICONS.items() for e in faces}
+
+# Emoticons split apart by punctuation handling are glued back together
+RE_EMOTICONS = re.compile(r"(%s)($|\s)" % "|".join(
+    r" ?".join(re.escape(c) for c in e) for faces in EMOTICONS.values() for e in faces
+))
+# Contractions are split off the word before quotes are spaced out, in
+# pattern's order ("can't" -> "ca n't"), so the negation is its own token
+CONTRACTIONS = (
+    ("'d", " 'd"), ("'m", " 'm"), ("'s", " 's"), ("'ll", " 'll"),
+    ("'re", " 're"), ("'ve", " 've"), ("n't", " n't"),
+)
+RE_SARCASM = re.compile(r"\( ?\! ?\)")
+RE_ABBREVIATION = re.compile(r"^([A-Za-z]\.)+$|^[A-Z][bcdfghjklmnpqrstvwxz]+\.$")
+
+
+def _lexicon_path():
+    """The lexicon ships with TextBlob, so scores stay comparable with it."""
+    import textblob
+    return os.path.join(os.path.dirname(textblob.__file__), "en", "en-sentiment.xml")
+
+
+@lru_cache(maxsize=1)
+def load_lexicon(path=None):
+    """
+    Compiles the sentiment lexicon into a dict of
+    word -> (polarity, intensity, is_modifier), parsed once per process.
+    Scores are averaged over all senses and part-of-speech tags,
+    as TextBlob does for untagged text.
+    """
+    senses = {}
+    for node in ElementTree.parse(path or _lexicon_path()).getroot().findall("word"):
+        word = node.attrib.get("form")
+        if not word:
+            continue
+        scores = (
+            float(node.attrib.get("polarity", 0.0)),
+            float(node.attrib.get("intensity", 1.0)),
+        )
+        senses.setdefault(word, {}).setdefault(node.attrib.get("pos"), []).append(scores)
+
+    lexicon = {}
+    adjectives = []
+    for word, by_pos in senses.items():
+        pos_averages = {pos: np.mean(scores, axis=0) for pos, scores in by_pos.items()}
+        polarity, intensity = np.mean(list(pos_averages.values()), axis=0)
+        # Adverbs modify the word that follows them ("very good")
+        lexicon[word] = (float(polarity), float(intensity), "RB" in by_pos)
+        if "JJ" in pos_averages:
+            adjectives.append((word, pos_averages["JJ"]))
+
+    # Map adjectives to adverbs scored like them ("terrible" -> "terribly")
+    for word, (polarity, intensity) in adjectives:
+        if word.endswith("y"):
+            word = word[:-1] + "i"
+        if word.endswith("le"):
+            word = word[:-2]
+        lexicon[word + "ly"] = (float(polarity), float(intensity), True)
+    return lexicon
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase word and punctuation tokens,
+    following pattern's find_tokens as used by TextBlob.
+    """
+    for contraction, spaced in CONTRACTIONS:
+        text = text.replace(contraction, spaced)
+    for quote in ("“", "”", "‘", "’", "'", '"'):
+        text = text.replace(quote, f" {quote} ")
+
+    tokens = []
+    for t in text.split():
+        tail = []
+        while t.startswith(_SPLIT_PUNCTUATION):
+            tokens.append(t[0])
+            t = t[1:]
+        while t.endswith(_SPLIT_PUNCTUATION + (".",)):
+            if t.endswith(_SPLIT_PUNCTUATION):
+                tail.append(t[-1])
+                t = t[:-1]
+            if t.endswith("..."):
+                tail.append("...")
+                t = t[:-3].rstrip(".")
+            if t.endswith("."):
+                if RE_ABBREVIATION.match(t):
+                    break
+                tail.append(".")
+                t = t[:-1]
+        if t:
+            tokens.append(t)
+        tokens.extend(reversed(tail))
+
+    joined = RE_SARCASM.sub("(!)", " ".join(tokens))
+    joined = RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), joined)
+    return joined.lower().split()
+
+
+def _assess(tokens, lexicon):
+    """
+    Returns the polarity of each scored word or phrase in tokens.
+    Intensifiers scale the next known word ("very good"), negations
+    flip and halve it ("not good"), and "!" boosts the previous score.
+    """
+    scores = []
+    negated = []
+    intensity = 1.0
+    modifier = None  # preceding known adverb
+    negation = None  # preceding negation
+
+    for w in tokens:
+        known = lexicon.get(w)
+        if known is not None:
+            p, i, is_modifier = known
+            if modifier is None:
+                scores.append(p)
+                negated.append(False)
+            else:
+                scores[-1] = max(-1.0, min(p * intensity, 1.0))
+            intensity = i
+            if negation is not None:
+                intensity = 1.0 / intensity
+                negated[-1] = True
+            modifier = w if is_modifier else None
+            negation = w if w in NEGATIONS else None
+            continue
+
+        if w in NEGATIONS:
+            negation = w
+        elif negation and len(w.strip("'")) > 1:
+            # Negation carries across small words ("not a good")
+            negation = None
+        if negation is not None and modifier is not None and modifier.endswith("ly"):
+            # "really not good"
+            negated[-1] = True
+            negation = None
+        elif modifier and len(w) > 2:
+            modifier = None
+
+        if w == "!" and scores:
+            scores[-1] = max(-1.0, min(scores[-1] * 1.25, 1.0))
+        if w == "(!)":
+            scores.append(0.0)
+            negated.append(False)
+            intensity = 1.0
+        if not w.isalpha() and len(w) <= 5 and w not in PUNCTUATION:
+            emoticon = EMOTICON_POLARITY.get(w)
+            if emoticon is not None:
+                scores.append(emoticon)
+                negated.append(False)
+                intensity = 1.0
+
+    return [p * -0.5 if n else p for p, n in zip(scores, negated)]
+
+
+def score_sentiments(texts):
+    """
+    Scores a list of texts in one pass.
+    Returns a float64 array of polarities between -1 and 1,
+    matching TextBlob's polarity within POLARITY_TOLERANCE.
+    """
+    lexicon = load_lexicon()
+    values = []
+    owners = []
+    for k, text in enumerate(texts):
+        scores = _assess(tokenize(text), lexicon)
+        values.extend(scores)
+        owners.extend([k] * len(scores))
+
+    # Per-text mean of assessment scores; texts with none score 0.0
+    owners = np.asarray(owners, dtype=np.intp)
+    totals = np.bincount(owners, weights=values, minlength=len(texts))
+    counts = np.bincount(owners, minlength=len(texts))
+    return totals / np.maximum(counts, 1)
+
+
+def score_sentiment(text):
+    """Scores a single text. Returns polarity between -1 and 1."""
+    return float(score_sentiments([text])[0])
@@ -0,0 +1,255 @@
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from config import SNAPSHOT_DIR
+from database import connect, get_db_state, iter_entries
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, fine for the dev server
+    fcntl = None
+
+# Fixed-width column files, one value per row, in id order
+COLUMNS = {
+    "id": np.int64,
+    "timestamp": np.int64,     # seconds since the epoch
+    "sentiment": np.float32,
+    "emotion": np.int16,       # index into meta["emotions"], -1 if missing
+    "entry_end": np.int64,     # end offset of each entry in entry.txt
+}
+TEXT_FILE = "entry.txt"
+META_FILE = "meta.json"
+
+# Snapshot opened by this worker; replaced when the data version moves
+_current = None
+
+
+class JournalSnapshot:
+    """
+    Read-only columnar view of the journal backed by memory-mapped files.
+    Rows are in insertion (id) order. Every worker maps the same files,
+    so the data lives once in the OS page cache rather than once per process.
+    """
+
+    def __init__(self, directory, meta):
+        rows = meta["rows"]
+        self.state = _state(meta)
+        self.version = meta["version"]
+        self.emotions = list(meta["emotions"])
+        self.id = _map(directory, "id", rows)
+        self.timestamp = _map(directory, "timestamp", rows)
+        self.sentiment = _map(directory, "sentiment", rows)
+        self.emotion = _map(directory, "emotion", rows)
+        self._entry_end = _map(directory, "entry_end", rows)
+        self._entry_text = _map_bytes(os.path.join(directory, TEXT_FILE), meta["text_bytes"])
+
+    def __len__(self):
+        return len(self.id)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def emotion_labels(self, codes=None):
+        """Maps emotion codes (all rows by default) back to their labels."""
+        codes = self.emotion if codes is None else codes
+        return [self.emotions[c] if c >= 0 else None for c in codes]
+
+    def scored_sentiment(self):
+        """Sentiment of the rows that have one; NULL sentiments are stored as NaN."""
+        return self.sentiment[~np.isnan(self.sentiment)]
+
+    def timestamps_iso(self, rows=None):
+        """ISO 8601 strings for the timestamps of the given rows."""
+        seconds = self.timestamp if rows is None else self.timestamp[rows]
+        return np.datetime_as_string(seconds.astype("datetime64[s]")).tolist()
+
+    def entries(self, rows):
+        """Decodes the entry text of the given rows."""
+        texts = []
+        for row in rows:
+            start = self._entry_end[row - 1] if row > 0 else 0
+            texts.append(bytes(self._entry_text[start:self._entry_end[row]]).decode("utf-8"))
+        return texts
+
+
+def load_snapshot():
+    """
+    Returns a snapshot that matches the current database and data version,
+    appending any new entries to the on-disk columns first.
+    """
+    global _current
+    state = get_db_state()
+    if _current is not None and _current.state == state:
+        return _current
+
+    meta = _read_meta()
+    if meta is None or _state(meta) != state:
+        meta = refresh_snapshot()
+    _current = JournalSnapshot(_generation_dir(meta), meta)
+    return _current
+
+
+def refresh_snapshot(chunk_size=1000):
+    """
+    Brings the on-disk snapshot up to date with the database.
+    New rows are appended in place; readers only map the row count
+    recorded in meta.json, so they never see a partial append.
+    A full rebuild into a fresh directory happens only when the
+    database no longer extends the snapshot: its db_id differs
+    (it was recreated) or its version went backwards.
+    Returns the new snapshot metadata.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with _locked():
+        meta = _read_meta()
+        conn = connect()
+        try:
+            # One read transaction, so the version matches the rows we copy
+            conn.execute("BEGIN")
+            db_id, version = get_db_state(conn)
+            if meta is not None and _state(meta) == (db_id, version):
+                return meta
+
+            stale = meta
+            if meta is None or meta.get("db_id") != db_id or version < meta["version"]:
+                generation = meta["generation"] + 1 if meta else 0
+                meta = {"generation": generation, "db_id": db_id, "version": 0, "rows": 0,
+                        "last_id": 0, "text_bytes": 0, "emotions": []}
+                os.makedirs(_generation_dir(meta), exist_ok=True)
+
+            directory = _generation_dir(meta)
+            _truncate_to(directory, meta)
+
+            entries = iter_entries(chunk_size, after_id=meta["last_id"], conn=conn)
+            while True:
+                chunk = list(islice(entries, chunk_size))
+                if not chunk:
+                    break
+                _append(directory, meta, [
+                    (e["id"], e["timestamp"], e["entry"], e["sentiment"], e["emotion"])
+                    for e in chunk
+                ])
+            meta["version"] = version
+        finally:
+            conn.close()
+
+        _write_meta(meta)
+        if stale is not None and stale["generation"] != meta["generation"]:
+            # Workers still mapping the old files keep them until they unmap
+            shutil.rmtree(_generation_dir(stale), ignore_errors=True)
+        return meta
+
+
+def _append(directory, meta, rows):
+    """Appends a chunk of (id, timestamp, entry, sentiment, emotion) rows."""
+    ids, timestamps, texts, sentiments, emotions = zip(*rows)
+
+    codes = []
+    index = {label: code for code, label in enumerate(meta["emotions"])}
+    for label in emotions:
+        if label is None:
+            codes.append(-1)
+            continue
+        if label not in index:
+            index[label] = len(meta["emotions"])
+            meta["emotions"].append(label)
+        codes.append(index[label])
+
+    encoded = [(text or "").encode("utf-8") for text in texts]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+
+    columns = {
+        "id": np.array(ids, dtype=np.int64),
+        "timestamp": _to_epoch_seconds(timestamps),
+        "sentiment": np.array([np.nan if s is None else s for s in sentiments], dtype=np.float32),
+        "emotion": np.array(codes, dtype=np.int16),
+        "entry_end": meta["text_bytes"] + np.cumsum(lengths),
+    }
+    for name, values in columns.items():
+        with open(_column_path(directory, name), "ab") as f:
+            f.write(values.astype(COLUMNS[name]).tobytes())
+    with open(os.path.join(directory, TEXT_FILE), "ab") as f:
+        f.write(b"".join(encoded))
+
+    meta["rows"] += len(rows)
+    meta["last_id"] = int(ids[-1])
+    meta["text_bytes"] += int(lengths.sum())
+
+
+def _to_epoch_seconds(timestamps):
+    parsed = pd.to_datetime(pd.Series(timestamps, dtype=object), format="ISO8601", errors="coerce")
+    return parsed.to_numpy(dtype="datetime64[ns]").astype("datetime64[s]").astype(np.int64)
+
+
+def _truncate_to(directory, meta):
+    """Drops bytes past the recorded row count, left over from an interrupted append."""
+    for name, dtype in COLUMNS.items():
+        _truncate(_column_path(directory, name), meta["rows"] * np.dtype(dtype).itemsize)
+    _truncate(os.path.join(directory, TEXT_FILE), meta["text_bytes"])
+
+
+def _truncate(path, size):
+    with open(path, "ab") as f:
+        if f.tell() > size:
+            f.truncate(size)
+
+
+def _map(directory, name, rows):
+    dtype = COLUMNS[name]
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(_column_path(directory, name), dtype=dtype, mode="r", shape=(rows,))
+
+
+def _map_bytes(path, size):
+    if size == 0:
+        return np.empty(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r", shape=(size,))
+
+
+def _state(meta):
+    # Snapshots written before db_id existed have none, so they get rebuilt once
+    return meta.get("db_id"), meta["version"]
+
+
+def _column_path(directory, name):
+    return os.path.join(directory, f"{name}.bin")
+
+
+def _generation_dir(meta):
+    return os.path.join(SNAPSHOT_DIR, f"g{meta['generation']}")
+
+
+def _read_meta():
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_meta(meta):
+    path = os.path.join(SNAPSHOT_DIR, META_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(path + ".tmp", path)
+
+
+@contextmanager
+def _locked():
+    """Serializes snapshot writers across threads and worker processes."""
+    with open(os.path.join(SNAPSHOT_DIR, ".lock"), "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,193 @@
+"""
+Tiered storage: entries older than COLD_STORAGE_AGE_DAYS move into
+journals_cold with their text compressed. Reads see both tiers: through
+the all_journals view, or per tier in search_entries and iter_entries,
+which decompress only the rows they return.
+
+Run `python storage.py [max_age_days]` to compact once and print
+before/after sizes and query latency.
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from compression import COLD_TEXT_FIELDS, DEFAULT_CODEC, pack_fields
+from config import (
+    DB_FILE, COLD_STORAGE_AGE_DAYS, COMPACTION_INTERVAL_HOURS, VACUUM_INTERVAL_HOURS
+)
+from database import connect
+
+_compaction_thread = None
+
+
+def compact(max_age_days=COLD_STORAGE_AGE_DAYS, chunk_size=500):
+    """
+    Moves entries older than max_age_days into cold storage.
+    Each chunk is moved in its own transaction, so readers never see
+    an entry twice or not at all. Returns the number of entries moved.
+    """
+    cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+    conn = connect()
+    moved = 0
+    try:
+        while True:
+            rows = conn.execute("""
+                SELECT id, timestamp, entry, reflection, summary, followups,
+                       tone, safety, sentiment, emotion
+                FROM journals WHERE timestamp < ? ORDER BY id LIMIT ?
+            """, (cutoff, chunk_size)).fetchall()
+            if not rows:
+                break
+
+            cold_rows = []
+            for id_, timestamp, entry, reflection, summary, followups, tone, safety, sentiment, emotion in rows:
+                payload = pack_fields(dict(zip(COLD_TEXT_FIELDS, (entry, reflection, summary, followups))))
+                cold_rows.append((id_, timestamp, tone, safety, sentiment, emotion, DEFAULT_CODEC, payload))
+
+            with conn:
+                conn.executemany("""
+                    INSERT INTO journals_cold (id, timestamp, tone, safety, sentiment, emotion, codec, payload)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, cold_rows)
+                conn.executemany("DELETE FROM journals WHERE id = ?", [(row[0],) for row in rows])
+            moved += len(rows)
+    finally:
+        conn.close()
+    return moved
+
+
+def vacuum():
+    """Rebuilds the database file so pages freed by compaction go back to the OS."""
+    conn = connect()
+    try:
+        conn.execute("VACUUM")
+        _set_meta(conn, "last_vacuum", int(time.time()))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_maintenance(max_age_days=COLD_STORAGE_AGE_DAYS, force_vacuum=False, timings=False):
+    """
+    Compacts old entries, then vacuums if VACUUM_INTERVAL_HOURS have passed
+    since the last vacuum (or force_vacuum is set).
+    Returns a dict with the entries moved and storage reports from before and after;
+    timings is passed on to storage_report.
+    """
+    before = storage_report(timings)
+    moved = compact(max_age_days)
+
+    conn = connect()
+    try:
+        last_vacuum = _get_meta(conn, "last_vacuum")
+    finally:
+        conn.close()
+    vacuumed = force_vacuum or time.time() - last_vacuum >= VACUUM_INTERVAL_HOURS * 3600
+    if vacuumed:
+        vacuum()
+
+    return {
+        "moved": moved,
+        "vacuumed": vacuumed,
+        "before": before,
+        "after": storage_report(timings)
+    }
+
+
+def storage_report(timings=False):
+    """
+    Returns on-disk size and row counts per tier.
+    With timings, also query latency: hot_query_ms times a full read of the
+    hot table; all_query_ms times the same read across both tiers, including
+    decompression. Timing reads and sorts every row, so leave it off in workers.
+    """
+    conn = connect()
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        hot_rows = conn.execute("SELECT COUNT(*) FROM journals").fetchone()[0]
+        cold_rows = conn.execute("SELECT COUNT(*) FROM journals_cold").fetchone()[0]
+        report = {
+            "file_bytes": os.path.getsize(DB_FILE),
+            "used_bytes": (page_count - free_pages) * page_size,
+            "free_bytes": free_pages * page_size,
+            "hot_rows": hot_rows,
+            "cold_rows": cold_rows
+        }
+        if timings:
+            report["hot_query_ms"] = _time_query(conn, "SELECT * FROM journals ORDER BY timestamp DESC")
+            report["all_query_ms"] = _time_query(conn, "SELECT * FROM all_journals ORDER BY timestamp DESC")
+    finally:
+        conn.close()
+    return report
+
+
+def start_background_compaction(interval_hours=COMPACTION_INTERVAL_HOURS):
+    """
+    Starts a daemon thread that runs maintenance every interval_hours.
+    Every worker may start one; each run is claimed through the meta table,
+    so only one worker does the work per interval.
+    """
+    global _compaction_thread
+    if _compaction_thread is not None:
+        return _compaction_thread
+
+    def loop():
+        while True:
+            try:
+                if _claim_run(interval_hours):
+                    result = run_maintenance()
+                    print(f"🗄️ Compaction moved {result['moved']} entries "
+                          f"({result['before']['file_bytes']} → {result['after']['file_bytes']} bytes)")
+            except Exception as e:
+                print(f"⚠️ Background compaction failed: {e}")
+            time.sleep(interval_hours * 3600)
+
+    _compaction_thread = threading.Thread(target=loop, name="journal-compaction", daemon=True)
+    _compaction_thread.start()
+    return _compaction_thread
+
+
+def _claim_run(interval_hours):
+    """Atomically records this run in meta unless another worker ran within the interval."""
+    now = int(time.time())
+    conn = connect()
+    try:
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('last_compaction', 0)")
+        claimed = conn.execute(
+            "UPDATE meta SET value = ? WHERE key = 'last_compaction' AND value <= ?",
+            (now, now - int(interval_hours * 3600))
+        ).rowcount == 1
+        conn.commit()
+    finally:
+        conn.close()
+    return claimed
+
+
+def _get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+
+def _set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _time_query(conn, sql):
+    start = time.perf_counter()
+    conn.execute(sql).fetchall()
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+if __name__ == "__main__":
+    from database import init_db
+
+    init_db()
+    age = int(sys.argv[1]) if len(sys.argv) > 1 else COLD_STORAGE_AGE_DAYS
+    result = run_maintenance(age, force_vacuum=True, timings=True)
+    print(f"Moved {result['moved']} entries older than {age} days to cold storage")
+    for key in result["before"]:
+        print(f"  {key:<14} {result['before'][key]:>14} → {result['after'][key]}")
@@ -1,7 +1,10 @@
 from config import CRISIS_WORDS
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
 import pandas as pd
+import base64
+import json
 from collections import Counter
 
 # Enhanced crisis detection keywords
@@ -64,90 +67,114 @@ def get_similar_entries(current_text, df, top_n=3):
     return similar
 
 
-def get_emotion_patterns(df):
+def _sentiment_levels(sentiment):
+    """0 = negative (< -0.3), 1 = neutral, 2 = positive (> 0.3)."""
+    # Compare in float32 so values stored as exactly ±0.3 stay neutral
+    return np.where(
+        sentiment > np.float32(0.3), 2, np.where(sentiment < np.float32(-0.3), 0, 1)
+    )
+
+
+def _top_counts(counts, labels, n=None):
+    """Nonzero counts as {label: count}, most frequent first."""
+    order = np.argsort(-counts, kind="stable")
+    order = order[counts[order] > 0][:n]
+    return {labels(i): int(counts[i]) for i in order}
+
+
+def get_emotion_patterns(snap):
     """
-    Analyzes emotion patterns in the journal.
+    Analyzes emotion patterns in the journal snapshot.
     Returns dict with emotion frequency, combinations, and trends.
     """
-    if df.empty:
+    if snap.empty:
         return {}
     
-    emotion_counts = df["emotion"].value_counts().to_dict()
+    codes = snap.emotion
+    known = codes >= 0
+    emotion_counts = np.bincount(codes[known], minlength=len(snap.emotions))
+    sentiment = snap.sentiment
+    # Entries without a sentiment are skipped, as pandas did
+    scored = snap.scored_sentiment()
+    # Sentiment is stored as float32; round away the widening noise
     sentiment_stats = {
-        "average": df["sentiment"].mean(),
-        "highest": df["sentiment"].max(),
-        "lowest": df["sentiment"].min(),
-        "std_dev": df["sentiment"].std()
+        "average": round(float(scored.mean(dtype=np.float64)), 6) if len(scored) else 0.0,
+        "highest": round(float(scored.max()), 6) if len(scored) else 0.0,
+        "lowest": round(float(scored.min()), 6) if len(scored) else 0.0,
+        "std_dev": round(float(scored.std(dtype=np.float64, ddof=1)), 6) if len(scored) > 1 else 0.0
     }
     
     # Find most common emotion combinations (emotion + sentiment category)
-    df_copy = df.copy()
-    df_copy["sentiment_level"] = df_copy["sentiment"].apply(
-        lambda x: "positive" if x > 0.3 else "negative" if x < -0.3 else "neutral"
-    )
-    combo_counts = (df_copy["emotion"] + " + " + df_copy["sentiment_level"]).value_counts().head(5).to_dict()
+    level_names = ("negative", "neutral", "positive")
+    combos = codes[known] * 3 + _sentiment_levels(sentiment[known])
+    combo_counts = np.bincount(combos, minlength=len(snap.emotions) * 3)
     
     return {
-        "emotion_frequency": emotion_counts,
+        "emotion_frequency": _top_counts(emotion_counts, lambda i: snap.emotions[i]),
         "sentiment_stats": sentiment_stats,
-        "common_combinations": combo_counts,
-        "total_entries": len(df)
+        "common_combinations": _top_counts(
+            combo_counts, lambda i: f"{snap.emotions[i // 3]} + {level_names[i % 3]}", 5
+        ),
+        "total_entries": len(snap)
     }
 
 
-def get_sentiment_trends(df):
+def get_sentiment_trends(snap):
     """
     Returns weekly sentiment trends for visualization.
     """
-    if df.empty:
+    if snap.empty:
         return None
     
-    df_copy = df.copy()
-    df_copy["timestamp"] = pd.to_datetime(df_copy["timestamp"])
-    df_copy["week"] = df_copy["timestamp"].dt.isocalendar().week
+    df = pd.DataFrame({
+        "timestamp": snap.timestamp.astype("datetime64[s]"),
+        "sentiment": snap.sentiment
+    })
+    df["week"] = df["timestamp"].dt.isocalendar().week
     
-    weekly_trends = df_copy.groupby("week").agg({
+    weekly_trends = df.groupby("week").agg({
         "sentiment": ["mean", "min", "max", "count"]
     }).round(2)
     
     return weekly_trends
 
 
-def get_emotion_triggers(df):
+def get_emotion_triggers(snap):
     """
     Identifies patterns: which emotions follow specific emotions?
     Returns most common emotion transitions.
     """
-    if len(df) < 2:
+    if len(snap) < 2:
         return {}
     
-    df_sorted = df.sort_values("timestamp").reset_index(drop=True)
-    emotions = df_sorted["emotion"].tolist()
-    
-    transitions = []
-    for i in range(len(emotions) - 1):
-        transitions.append(f"{emotions[i]} → {emotions[i+1]}")
+    order = np.argsort(snap.timestamp, kind="stable")
+    codes = np.asarray(snap.emotion)[order]
+    codes = codes[codes >= 0]
+    if len(codes) < 2:
+        return {}
     
-    transition_counts = Counter(transitions).most_common(5)
-    return {t[0]: t[1] for t in transition_counts}
+    k = len(snap.emotions)
+    transitions = np.bincount(codes[:-1] * k + codes[1:], minlength=k * k)
+    return _top_counts(
+        transitions, lambda i: f"{snap.emotions[i // k]} → {snap.emotions[i % k]}", 5
+    )
 
 
-def get_low_sentiment_context(df, threshold=-0.3):
+def get_low_sentiment_context(snap, threshold=-0.3):
     """
     For entries with low sentiment, analyze what might have contributed.
     Returns top words from low-sentiment entries.
     """
-    if df.empty:
+    if snap.empty:
         return []
     
-    low_sentiment_entries = df[df["sentiment"] < threshold]
-    if low_sentiment_entries.empty:
+    low_rows = np.flatnonzero(snap.sentiment < np.float32(threshold))
+    if len(low_rows) == 0:
         return []
     
-    all_text = " ".join(low_sentiment_entries["entry"].tolist())
+    all_text = " ".join(snap.entries(low_rows))
     
     # Simple word frequency (in production, use NLTK for better NLP)
-    from collections import Counter
     words = all_text.lower().split()
     # Filter common stop words
     stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "is", "are", "was", "were"}
@@ -155,3 +182,27 @@ def get_low_sentiment_context(df, threshold=-0.3):
     
     top_words = Counter(filtered_words).most_common(10)
     return {word: count for word, count in top_words}
+
+
+def encode_cursor(cursor):
+    """
+    Encodes a (sort value, id) search cursor as an opaque URL-safe string.
+    Returns None when there is no next page.
+    """
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode()
+
+
+def decode_cursor(token):
+    """
+    Decodes a cursor produced by encode_cursor.
+    Raises ValueError if the token is malformed.
+    """
+    if not token:
+        return None
+    try:
+        value, entry_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return value, int(entry_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")